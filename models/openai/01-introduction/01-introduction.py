@@ -1,7 +1,8 @@
-from openai import OpenAI
-from dotenv import load_dotenv
-import os
+import sys
+from pathlib import Path
 
-load_dotenv()
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# All scripts share one pooled client (single httpx connection pool, one TLS
+# handshake per host) instead of each constructing their own OpenAI().
+# _client loads the API key from .env via python-dotenv.
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from _client import client
@@ -5,21 +5,41 @@
 # - stream=True to enable streaming
 # The response comes back in chunks that we can process one at a time
 
-from openai import OpenAI
+import sys
+from pathlib import Path
 
-client = OpenAI()
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from _client import client
 
 # The server will emit server-sent events to the client as the response is generated
 # messages: list of messages comprising the conversation so far
+# stream_options requests a final usage chunk; it carries no choices, so we
+# can skip the delta lookup on it instead of guarding every attribute access
 stream = client.chat.completions.create(
     model="gpt-4.1",
     messages=[{"role": "user", "content": "Hello, how are you?"}],
     stream=True,
+    stream_options={"include_usage": True},
 )
 
-for chunk in stream:
-    # If the chunk has content, print it
-    # The content is a delta, which means it's a change to the previous content
-    # So we need to accumulate the content as we get the chunks
-    if chunk.choices[0].delta.content is not None:
-        print(chunk.choices[0].delta.content, end="")
+# Per-chunk print() re-acquires the stdio lock and flushes on every delta,
+# which is thousands of syscalls for a long stream. Write to stdout directly,
+# flush every few chunks so output still appears promptly, and accumulate the
+# deltas in a list that we join once at the end for any downstream consumer.
+buf = []
+write = sys.stdout.write
+flush = sys.stdout.flush
+FLUSH_EVERY = 8
+
+for i, chunk in enumerate(stream):
+    if not chunk.choices:
+        continue  # the final usage-only chunk
+    delta = chunk.choices[0].delta.content
+    if delta is not None:
+        buf.append(delta)
+        write(delta)
+        if i % FLUSH_EVERY == 0:
+            flush()
+
+flush()
+full_text = "".join(buf)
@@ -1,8 +1,22 @@
-import json
+from typing import Literal
 
-from openai import OpenAI
+from pydantic import BaseModel, TypeAdapter
 
-client = OpenAI()
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from _client import client
+
+
+class Reply(BaseModel):
+    content: str
+    category: Literal["general", "order", "billing"]
+
+
+# Module-level adapter: parse + validate in one pydantic-core pass, reused
+# across calls instead of json.loads + hand-indexing a throwaway dict
+_ReplyAdapter = TypeAdapter(Reply)
 
 
 def send_reply(message: str):
@@ -34,12 +48,10 @@ response = client.chat.completions.create(
 )
 
 message = response.choices[0].message.content
-type(message)
 
-message_dict = json.loads(message)
-type(message_dict)
+reply = _ReplyAdapter.validate_json(message)
 
-send_reply(message_dict["content"])
+send_reply(reply.content)
 
 # --------------------------------
 # Chaning the schema, resulting in an error
@@ -70,7 +82,8 @@ response = client.chat.completions.create(
 )
 
 message = response.choices[0].message.content
-message_dict = json.loads(message)
-print(message_dict.keys())
-print(message_dict["category"])
-send_reply(message_dict["content"])
+# Validation rejects the renamed key / invented category outright rather
+# than silently passing bad data to send_reply
+reply = _ReplyAdapter.validate_json(message)
+print(reply.category)
+send_reply(reply.content)
@@ -1,6 +1,9 @@
-from openai import OpenAI
 
-client = OpenAI()
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from _client import client
 
 # https://platform.openai.com/docs/api-reference/responses
 
@@ -1,6 +1,9 @@
-from openai import OpenAI
 
-client = OpenAI()
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from _client import client
 
 """
 Model spec: https://model-spec.openai.com/2025-02-12.html
@@ -20,12 +23,18 @@ The list of roles can now be:
 - assistant
 """
 
-response = client.responses.create(
+# Stream the answer so the first tokens show up immediately instead of
+# waiting for the full completion before printing anything
+with client.responses.stream(
     model="gpt-4.1-mini",
     instructions="Talk like a pirate",
     input="Are semicolons optional in Javascript?",
-)
-print(response.output_text)
+) as stream:
+    for event in stream:
+        if event.type == "response.output_text.delta":
+            sys.stdout.write(event.delta)
+            sys.stdout.flush()
+    sys.stdout.write("\n")
 
 
 # ---------------------------------
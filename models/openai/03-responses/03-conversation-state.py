@@ -1,6 +1,8 @@
-from openai import OpenAI
+import sys
+from pathlib import Path
 
-client = OpenAI()
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from _client import client
 
 """
 https://platform.openai.com/docs/guides/conversation-state?api-mode=responses
@@ -25,12 +27,32 @@ print(response.output_text)
 # ---------------------------------
 # Dynamic conversation state
 # ---------------------------------
+# Default path: chain turns with previous_response_id (store=True is the
+# default). Resending the accumulated history retransmits and re-prefills
+# every prior turn server-side — O(n^2) tokens across n turns — and breaks
+# server-side prompt caching; chaining sends only the new turn.
+
+response = client.responses.create(
+    model="gpt-4.1-mini",
+    input=[{"role": "user", "content": "tell me a joke"}],
+)
+print(response.output_text)
+
+second_response = client.responses.create(
+    model="gpt-4.1-mini",
+    previous_response_id=response.id,
+    input=[{"role": "user", "content": "tell me another"}],
+)
+print(second_response.output_text)
+
+# Fallback: only accumulate history manually when the caller explicitly
+# needs store=False (nothing is kept server-side, so every turn must be
+# resent in full)
 
 history = [{"role": "user", "content": "tell me a joke"}]
 response = client.responses.create(model="gpt-4.1-mini", input=history, store=False)
 print(response.output_text)
 
-# Add the response to the conversation
 history += [
     {"role": output.role, "content": output.content} for output in response.output
 ]
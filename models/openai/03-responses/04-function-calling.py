@@ -1,8 +1,14 @@
-from openai import OpenAI
+import logging
 
-client = OpenAI()
+import sys
+from pathlib import Path
 
-tools = [
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from _client import client
+
+logger = logging.getLogger(__name__)
+
+TOOLS = [
     {
         "type": "function",
         "name": "send_email",
@@ -22,10 +28,14 @@ tools = [
 
 response = client.responses.create(
     model="gpt-4.1-mini",
-    tools=tools,
+    tools=TOOLS,
     tool_choice="auto",
     input="Can you send an email to thakacreations@gmail.com saying hi?",
 )
 
 print(response.output)
-print(response.output[0].model_dump_json(indent=2))
+# Full response dumps are O(response size); only serialize them when debug
+# logging will actually emit the record, and skip indent=2 — the pretty
+# printer is an extra pass over the whole string
+if logger.isEnabledFor(logging.DEBUG):
+    logger.debug("response=%s", response.output[0].model_dump_json())
@@ -1,9 +1,19 @@
-import json
-from openai import OpenAI
 from typing import List
+
+import orjson
 from pydantic import BaseModel
 
-client = OpenAI()
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from _client import client
+
+
+class CalendarEvent(BaseModel):
+    name: str
+    date: str
+    participants: List[str]
 
 # --------------------------------
 # Using a JSON Schema
@@ -38,16 +48,16 @@ response = client.responses.create(
     },
 )
 
-event = json.loads(response.output_text)
+# Safety argument: the schema above sets strict=True, so the API enforces
+# schema conformance server-side and full Pydantic validation here would be
+# redundant. model_construct builds the instance without running
+# pydantic-core validation (roughly 5-10x faster on large nested models).
+# If strict=True is ever dropped from the schema, switch back to
+# TypeAdapter(CalendarEvent).validate_json(response.output_text).
+event = CalendarEvent.model_construct(**orjson.loads(response.output_text))
 print(event)
 
 
-class CalendarEvent(BaseModel):
-    name: str
-    date: str
-    participants: List[str]
-
-
 response = client.responses.parse(
     model="gpt-4.1-mini",
     input="Alice and Bob are going to a science fair on Friday",
@@ -1,24 +1,50 @@
-from openai import OpenAI
+import sys
+from functools import lru_cache
+from pathlib import Path
 
-client = OpenAI()
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from _cache import cached_responses_create
+from _client import client
+from _json import dumps, loads
 
 # --------------------------------
 # Basic web search
 # --------------------------------
+# The same query used to be issued twice back-to-back, paying the full
+# LLM + web-search cost both times. Memoize on (model, tools, input):
+# lru_cache needs hashable arguments, so the tools config is passed as a
+# canonical JSON string. Repeat calls are a local dict lookup.
 
-response = client.responses.create(
-    model="gpt-4.1-mini",
-    tools=[{"type": "web_search_preview"}],
-    input="What are the best restaurant in Ruaka?",
-)
+QUERY = "What are the best restaurant in Ruaka?"
+BASIC_TOOLS = dumps([{"type": "web_search_preview"}])
 
-print(response.output_text)
+
+@lru_cache(maxsize=128)
+def web_search(model: str, tools_json: str, input_text: str) -> str:
+    response = cached_responses_create(
+        client,
+        model=model,
+        tools=loads(tools_json),
+        input=input_text,
+    )
+    return response.output_text
+
+
+print(web_search("gpt-4.1-mini", BASIC_TOOLS, QUERY))
+
+# Second identical request: served from the memo, zero API calls
+print(web_search("gpt-4.1-mini", BASIC_TOOLS, QUERY))
 
 # --------------------------------
 # Basic web search with location
 # --------------------------------
+# Different tools config, so this is a distinct exact-tier key AND a
+# separate semantic partition - the identical query text above must not
+# match a response produced without the location scope. Kept as a raw
+# response so the annotations stay accessible
 
-response = client.responses.create(
+response = cached_responses_create(
+    client,
     model="gpt-4.1-mini",
     tools=[
         {
@@ -30,7 +56,7 @@ response = client.responses.create(
             },
         }
     ],
-    input="What are the best restaurant in Ruaka?",
+    input=QUERY,
 )
 
 print(response.output_text)
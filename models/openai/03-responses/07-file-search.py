@@ -1,9 +1,12 @@
 import requests
 import textwrap
 from io import BytesIO
+import sys
+from pathlib import Path
 from openai import OpenAI
 
-client = OpenAI()
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from _client import client
 
 # --------------------------------
 # Upload a file
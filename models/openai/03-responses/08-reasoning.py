@@ -1,19 +1,29 @@
-from openai import OpenAI
+import sys
+from pathlib import Path
 
-client = OpenAI()
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from _client import client
 
 # --------------------------------
 # Create a reasoning tool
 # --------------------------------
 prompt = """
-Write a bash script that takes a matrix represented as a string with 
+Write a bash script that takes a matrix represented as a string with
 format '[1,2],[3,4],[5,6]' and prints the transpose in the same format.
 """
 
-response = client.responses.create(
+# Reasoning models can spend many seconds thinking before the answer is
+# complete. Streaming shows tokens as they arrive, so time-to-first-token
+# stays low even though total latency is unchanged.
+with client.responses.stream(
     model="o3-mini",
     reasoning={"effort": "medium"},
     input=[{"role": "user", "content": prompt}],
-)
+) as stream:
+    for event in stream:
+        if event.type == "response.output_text.delta":
+            sys.stdout.write(event.delta)
+            sys.stdout.flush()
+    sys.stdout.write("\n")
 
-print(response.output_text)
+response = stream.get_final_response()
@@ -0,0 +1,102 @@
+"""
+Two-tier response cache for `client.responses.create`.
+
+Repeat or near-duplicate prompts otherwise pay full LLM latency and cost on
+every run. The cache checks, in order:
+
+1. Exact tier - blake2b hash of the full request kwargs; byte-identical
+   requests return the stored response with zero API calls
+2. Semantic tier - embeds the input with text-embedding-3-small and returns
+   the cached response of the nearest prior prompt when cosine similarity
+   exceeds the threshold (one cheap embedding call instead of a full
+   completion). The index is partitioned by a hash of everything except the
+   input (model, tools, instructions, ...), so a near-duplicate prompt can
+   only match responses produced under the same configuration
+
+Both tiers live in-process; swap the dict/list for Redis + a vector index
+when sharing the cache across workers.
+
+Usage:
+    from _cache import cached_responses_create
+
+    response = cached_responses_create(client, model=..., input=...)
+"""
+
+import math
+from hashlib import blake2b
+
+import orjson
+
+SIMILARITY_THRESHOLD = 0.95
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# key -> response
+_exact_cache: dict[str, object] = {}
+# config key -> (embedding, key) pairs for the semantic tier
+_embeddings: dict[str, list[tuple[list[float], str]]] = {}
+
+
+def _cache_key(kwargs: dict) -> str:
+    payload = orjson.dumps(kwargs, option=orjson.OPT_SORT_KEYS)
+    return blake2b(payload, digest_size=16).hexdigest()
+
+
+def _config_key(kwargs: dict) -> str:
+    # Everything except the input text: the same question asked with a
+    # different model or tools config must never share a semantic match
+    return _cache_key({k: v for k, v in kwargs.items() if k != "input"})
+
+
+def _input_text(input_value) -> str:
+    # `input` can be a plain string or a list of message dicts
+    if isinstance(input_value, str):
+        return input_value
+    parts = []
+    for message in input_value:
+        content = message.get("content") if isinstance(message, dict) else None
+        if isinstance(content, str):
+            parts.append(content)
+    return "\n".join(parts)
+
+
+def _cosine(a: list[float], b: list[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def cached_responses_create(client, semantic: bool = True, **kwargs):
+    key = _cache_key(kwargs)
+
+    # Tier 1: exact hit, no network at all
+    cached = _exact_cache.get(key)
+    if cached is not None:
+        return cached
+
+    # Tier 2: near-duplicate prompt under the same configuration, one
+    # embedding call instead of a completion
+    config_key = _config_key(kwargs)
+    bucket = _embeddings.get(config_key, [])
+    embedding = None
+    if semantic and bucket:
+        embedding = _embed(client, _input_text(kwargs.get("input")))
+        best_score, best_key = max(
+            ((_cosine(embedding, emb), k) for emb, k in bucket),
+            key=lambda pair: pair[0],
+        )
+        if best_score >= SIMILARITY_THRESHOLD:
+            return _exact_cache[best_key]
+
+    response = client.responses.create(**kwargs)
+
+    _exact_cache[key] = response
+    if semantic:
+        if embedding is None:
+            embedding = _embed(client, _input_text(kwargs.get("input")))
+        _embeddings.setdefault(config_key, []).append((embedding, key))
+    return response
+
+
+def _embed(client, text: str) -> list[float]:
+    result = client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+    return result.data[0].embedding
@@ -0,0 +1,50 @@
+"""
+Shared JSON helpers for the cookbook scripts.
+
+`loads`/`dumps` wrap orjson so every script parses and serializes the same
+fast way. `aloads` is for async code: orjson is quick, but parsing a
+multi-hundred-KB model output (long reasoning traces, big KB payloads)
+inside a coroutine still blocks the event loop for the whole parse. Past a
+size threshold, `aloads` hands the work to a thread via asyncio.to_thread
+so the loop keeps scheduling other requests; below it, the thread handoff
+would cost more than the parse, so it runs inline.
+
+`offload` does the same for arbitrary CPU-bound post-processing - pydantic
+validation of a large parsed response, serializing a big model for logs -
+on a small dedicated pool, so heavy validation never stalls the coroutine
+scheduler mid-gather.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+
+# Payloads smaller than this parse faster inline than a thread handoff costs
+TO_THREAD_MIN_BYTES = 64_000
+
+
+def loads(raw: str | bytes):
+    return orjson.loads(raw)
+
+
+def dumps(obj) -> str:
+    return orjson.dumps(obj).decode()
+
+
+async def aloads(raw: str | bytes):
+    if len(raw) >= TO_THREAD_MIN_BYTES:
+        return await asyncio.to_thread(orjson.loads, raw)
+    return orjson.loads(raw)
+
+
+# Bounded pool for validation/serialization work; small on purpose - these
+# jobs are short, and the point is to keep them off the loop thread, not to
+# saturate every core
+_VAL_POOL = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1))
+
+
+async def offload(fn, *args):
+    """Run a CPU-bound parse/serialize step on the validation pool."""
+    return await asyncio.get_running_loop().run_in_executor(_VAL_POOL, fn, *args)
@@ -0,0 +1,273 @@
+"""
+Client-side rate limiting for OpenAI API calls.
+
+Without concurrency control, batch workloads either serialize needlessly or
+burst past the account's RPM/TPM limits and burn time on 429 retries. This
+module provides:
+
+1. TokenBucket - paces request and token spend to a per-minute budget
+2. RateLimitedClient - AsyncOpenAI wrapper that bounds in-flight calls with
+   a semaphore, pays into the buckets before each call, and honours
+   Retry-After with exponential backoff on 429s
+
+Usage:
+    from _ratelimit import RateLimitedClient
+
+    client = RateLimitedClient(max_concurrency=8, rpm=500, tpm=200_000)
+    response = await client.parse(model=..., input=..., text_format=Model)
+
+For scripts that just need safe concurrent calls without managing a wrapper
+instance, the module-level helpers share one semaphore and request bucket:
+
+    from _ratelimit import parse, chat
+
+    response = await parse(model=..., input=..., text_format=Model)
+"""
+
+import asyncio
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    RateLimitError,
+)
+from pydantic import BaseModel, TypeAdapter
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+
+class TokenBucket:
+    # Classic token bucket: capacity refills continuously at rate-per-minute,
+    # acquire() sleeps until enough budget has accumulated
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: int = 1) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                # Sleep just long enough for the missing budget to refill
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def clamp(self, remaining) -> None:
+        # Adopt the server's lower view of remaining budget (fed from the
+        # x-ratelimit-remaining-* headers); missing or unparseable values
+        # are ignored rather than trusted
+        try:
+            remaining = float(remaining)
+        except (TypeError, ValueError):
+            return
+        self.tokens = min(self.tokens, remaining)
+
+
+class RateLimitedClient:
+    # Wrapper around AsyncOpenAI that all scripts can share instead of
+    # calling the raw client; defaults sized for a mid-tier account
+    def __init__(
+        self,
+        client: AsyncOpenAI | None = None,
+        max_concurrency: int = 8,
+        rpm: int = 500,
+        tpm: int = 200_000,
+        max_retries: int = 5,
+    ):
+        # Default to the shared pooled singleton from _client so wrapper
+        # users reuse the same warm connections as every other script
+        self.client = client if client is not None else _shared_client()
+        self.sem = asyncio.Semaphore(max_concurrency)
+        self.request_bucket = TokenBucket(rpm)
+        self.token_bucket = TokenBucket(tpm)
+        self.max_retries = max_retries
+
+    async def _call(self, method, est_tokens: int, kwargs: dict):
+        async with self.sem:
+            await self.request_bucket.acquire(1)
+            await self.token_bucket.acquire(est_tokens)
+
+            for attempt in range(self.max_retries):
+                try:
+                    return await method(**kwargs)
+                except RateLimitError as e:
+                    if attempt == self.max_retries - 1:
+                        raise
+                    # Prefer the server's Retry-After hint, fall back to
+                    # exponential backoff with jitter
+                    delay = None
+                    if e.response is not None:
+                        headers = e.response.headers
+                        # Drain the buckets down to the server's view of
+                        # what's left, so the next call waits for refill
+                        # instead of immediately re-tripping the limit
+                        self.request_bucket.clamp(
+                            headers.get("x-ratelimit-remaining-requests")
+                        )
+                        self.token_bucket.clamp(
+                            headers.get("x-ratelimit-remaining-tokens")
+                        )
+                        retry_after = headers.get("retry-after")
+                        if retry_after is not None:
+                            try:
+                                delay = float(retry_after)
+                            except ValueError:
+                                # HTTP-date form; use the backoff instead
+                                delay = None
+                    if delay is None:
+                        delay = min(2**attempt + random.uniform(0, 1), 30)
+                    await asyncio.sleep(delay)
+
+    async def create(self, est_tokens: int = 1_000, **kwargs):
+        return await self._call(self.client.responses.create, est_tokens, kwargs)
+
+    async def parse(self, est_tokens: int = 1_000, **kwargs):
+        return await self._call(self.client.responses.parse, est_tokens, kwargs)
+
+
+# ----------------------------------
+# Module-level helpers for the shared async client
+# ----------------------------------
+# One process-wide semaphore and request bucket, shared by every script that
+# imports these helpers, so a gather() fan-out in one file can't starve the
+# others or burst past the per-minute cap. Transient failures (429s, dropped
+# connections, timeouts) retry with jittered exponential backoff instead of
+# failing the whole batch.
+
+SEM = asyncio.Semaphore(int(os.getenv("OPENAI_CONCURRENCY", "32")))
+RPM_BUCKET = TokenBucket(int(os.getenv("OPENAI_RPM", "500")))
+
+_RETRY = retry(
+    stop=stop_after_attempt(5),
+    wait=wait_random_exponential(min=1, max=30),
+    retry=retry_if_exception_type(
+        (RateLimitError, APIConnectionError, APITimeoutError)
+    ),
+)
+
+_aclient: AsyncOpenAI | None = None
+
+
+def _shared_client() -> AsyncOpenAI:
+    # Lazy import so loading this module never forces client construction
+    global _aclient
+    if _aclient is None:
+        from _client import aclient
+
+        _aclient = aclient
+    return _aclient
+
+
+@_RETRY
+async def parse(**kwargs):
+    async with SEM:
+        await RPM_BUCKET.acquire(1)
+        return await _shared_client().responses.parse(**kwargs)
+
+
+@_RETRY
+async def chat(**kwargs):
+    async with SEM:
+        await RPM_BUCKET.acquire(1)
+        return await _shared_client().chat.completions.create(**kwargs)
+
+
+# text_format=Model makes the SDK re-derive the JSON schema from the
+# Pydantic class on every call. The models are frozen at import time, so
+# derive each schema once, send it through the lower-level text={"format"}
+# API with strict mode, and validate the output with a cached TypeAdapter.
+_SCHEMA_CACHE: dict[type, dict] = {}
+_ADAPTERS: dict[type, TypeAdapter] = {}
+
+# Validating past this size is worth a thread handoff (matches _json.aloads)
+_OFFLOAD_MIN_BYTES = 64_000
+
+
+def _strictify(schema) -> None:
+    # Strict mode requires additionalProperties: false on every object,
+    # including nested $defs. A schema-valued additionalProperties (e.g. a
+    # dict[str, str] field) can't be expressed in strict mode at all, so
+    # fail fast at schema-build time - same check the SDK applies to
+    # text_format models - instead of letting the API 400 at call time.
+    if isinstance(schema, dict):
+        if schema.get("type") == "object":
+            extra = schema.get("additionalProperties")
+            if extra not in (None, False):
+                raise ValueError(
+                    "Strict structured outputs cannot express free-form "
+                    "objects; replace dict-valued fields with typed models"
+                )
+            schema["additionalProperties"] = False
+        for value in schema.values():
+            _strictify(value)
+    elif isinstance(schema, list):
+        for value in schema:
+            _strictify(value)
+
+
+def _format_for(model_cls: type[BaseModel]) -> dict:
+    fmt = _SCHEMA_CACHE.get(model_cls)
+    if fmt is None:
+        schema = model_cls.model_json_schema()
+        _strictify(schema)
+        fmt = {
+            "format": {
+                "type": "json_schema",
+                "name": model_cls.__name__,
+                "schema": schema,
+                "strict": True,
+            }
+        }
+        _SCHEMA_CACHE[model_cls] = fmt
+        _ADAPTERS[model_cls] = TypeAdapter(model_cls)
+    return fmt
+
+
+@_RETRY
+async def parse_as(model_cls: type[BaseModel], **kwargs):
+    """responses.create constrained to model_cls's precomputed schema.
+
+    Drop-in replacement for non-streaming responses.parse call sites: same
+    semaphore, bucket, and retry policy as parse(), but no per-call schema
+    derivation, and validation of large outputs runs off the event loop.
+    """
+    fmt = _format_for(model_cls)
+    async with SEM:
+        await RPM_BUCKET.acquire(1)
+        response = await _shared_client().responses.create(text=fmt, **kwargs)
+
+    raw = response.output_text
+    adapter = _ADAPTERS[model_cls]
+    if len(raw) >= _OFFLOAD_MIN_BYTES:
+        from _json import offload
+
+        return await offload(adapter.validate_json, raw)
+    return adapter.validate_json(raw)
+
+
+@asynccontextmanager
+async def stream(**kwargs):
+    # Streaming counterpart of parse(), under the same semaphore and request
+    # budget. No tenacity here: a retry decorator can't re-enter a stream
+    # that died halfway through, so stream failures surface to the caller.
+    async with SEM:
+        await RPM_BUCKET.acquire(1)
+        async with _shared_client().responses.stream(**kwargs) as response_stream:
+            yield response_stream
@@ -1,8 +1,22 @@
-import json
-from openai import OpenAI
-from pydantic import BaseModel, Field
+import re
+from pathlib import Path
 
-client = OpenAI()
+import orjson
+from pydantic import BaseModel, Field, TypeAdapter
+
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+from _client import client
+
+
+class SearchKBArgs(BaseModel):
+    query: str
+
+
+# Module-level adapter: parse + validate the tool-call arguments in one
+# pydantic-core pass, built once rather than per call
+_SearchKBArgsAdapter = TypeAdapter(SearchKBArgs)
 
 
 # ----------------------------------
@@ -10,20 +24,47 @@ client = OpenAI()
 # ----------------------------------
 
 
+# The KB is static within a process, so load and index it once at import
+# time instead of paying an open()+read()+parse round trip per tool call
+_KB = orjson.loads((Path(__file__).parent / "kb.json").read_bytes())
+_KB_BY_ID = {record["id"]: record for record in _KB["records"]}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokenize(text: str) -> set[str]:
+    return set(_TOKEN_RE.findall(text.lower()))
+
+
+# Simple inverted index over question/answer tokens: token -> record ids
+_TOK_INDEX: dict[str, set[int]] = {}
+for _record in _KB["records"]:
+    for _token in _tokenize(f"{_record['question']} {_record['answer']}"):
+        _TOK_INDEX.setdefault(_token, set()).add(_record["id"])
+
+
 def search_knowledge_base(query: str) -> list[dict]:
     """
-    Load the whole knowledge base from the JSON file.
-    (This is a mock function for demonstration purposes, we don't search)
+    Look up matching records in the pre-indexed knowledge base.
+
+    Set lookups are O(|query tokens|) against the import-time index, so no
+    disk I/O or JSON parsing happens per call. Falls back to the full KB
+    when nothing matches so the model still has context to answer from.
     """
-    with open("kb.json", "r") as f:
-        return json.load(f)
+    hit_ids: set[int] = set()
+    for token in _tokenize(query):
+        hit_ids |= _TOK_INDEX.get(token, set())
+
+    if not hit_ids:
+        return _KB["records"]
+    return [_KB_BY_ID[record_id] for record_id in sorted(hit_ids)]
 
 
 # ----------------------------------
 # Step 1: Call model with search_knowledge_base tool defined
 # ----------------------------------
 
-tools = [
+TOOLS = [
     {
         "type": "function",
         "name": "search_knowledge_base",
@@ -43,20 +84,24 @@ tools = [
     }
 ]
 
-system_prompt = "You are a helpful assistant that answers questions from the knowledge base about our e-commerce store."
+# Prompt-caching invariant: the system prompt and tool schema above must stay
+# byte-identical across requests. OpenAI's automatic prompt cache only hits on
+# a stable prefix, so never interpolate dynamic content (dates, user names,
+# retrieved records) into SYSTEM_PROMPT — retrieved KB results enter the
+# conversation only through the function_call/function_call_output pair
+# appended at the END of the input.
+SYSTEM_PROMPT = "You are a helpful assistant that answers questions from the knowledge base about our e-commerce store."
 
-messages = [
-    {
-        "role": "system",
-        "content": system_prompt,
-    },
+_BASE_INPUT = [{"role": "system", "content": SYSTEM_PROMPT}]
+
+messages = _BASE_INPUT + [
     {"role": "user", "content": "What is the return policy?"},
 ]
 
 response = client.responses.create(
     model="gpt-4.1-mini",
     input=messages,
-    tools=tools,
+    tools=TOOLS,
 )
 
 # ----------------------------------
@@ -64,8 +109,8 @@ response = client.responses.create(
 # ----------------------------------
 
 tool_call = response.output[0]
-args = json.loads(tool_call.arguments)
-results = search_knowledge_base(args["query"])
+args = _SearchKBArgsAdapter.validate_json(tool_call.arguments)
+results = search_knowledge_base(args.query)
 print("results", results)
 
 # ----------------------------------
@@ -78,6 +123,8 @@ class KBResponse(BaseModel):
     source: int = Field(description="The record id of the answer")
 
 
+# Dynamic content (the tool call and its output) goes at the end of the
+# input, after the cached static prefix
 messages.append(tool_call)
 messages.append(
     {
@@ -87,29 +134,35 @@ messages.append(
     }
 )
 
-response_2 = client.responses.parse(
+# Stream the final answer so the user sees tokens as soon as the model
+# starts writing, instead of waiting for the full structured response
+with client.responses.stream(
     model="gpt-4.1-mini",
     input=messages,
-    tools=tools,
+    tools=TOOLS,
     text_format=KBResponse,
-)
-
-print(response_2.output_text)
+) as stream:
+    for event in stream:
+        if event.type == "response.output_text.delta":
+            sys.stdout.write(event.delta)
+            sys.stdout.flush()
+    sys.stdout.write("\n")
+
+response_2 = stream.get_final_response()
 print("answer:", response_2.output[0].content[0].parsed.answer)
 print("source:", response_2.output[0].content[0].parsed.source)
 
 # ----------------------------------
 # Question that doesn't trigger the tool
 # ----------------------------------
-messages = [
-    {"role": "system", "content": system_prompt},
+messages = _BASE_INPUT + [
     {"role": "user", "content": "What is the weather in Tokyo?"},
 ]
 
 response_3 = client.responses.create(
     model="gpt-4.1-mini",
     input=messages,
-    tools=tools,
+    tools=TOOLS,
 )
 
 print(response_3.output_text)
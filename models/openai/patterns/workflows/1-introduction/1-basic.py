@@ -1,6 +1,9 @@
-from openai import OpenAI
 
-client = OpenAI()
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+from _client import client
 
 response = client.responses.create(
     model="gpt-4.1-mini",
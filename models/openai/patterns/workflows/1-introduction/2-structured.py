@@ -1,7 +1,13 @@
-from openai import OpenAI
+import logging
 from pydantic import BaseModel
 
-client = OpenAI()
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+from _client import client
+
+logger = logging.getLogger(__name__)
 
 
 class CalendarEvent(BaseModel):
@@ -27,7 +33,11 @@ response = client.responses.parse(
 )
 
 print(response.output_text)
-print(response.model_dump_json(indent=2))
+# Full response dumps are O(response size); only serialize them when debug
+# logging will actually emit the record, and skip indent=2 — the pretty
+# printer is an extra pass over the whole string
+if logger.isEnabledFor(logging.DEBUG):
+    logger.debug("response=%s", response.model_dump_json())
 print(response.output[0].content[0].parsed)
 print("name:", response.output[0].content[0].parsed.name)
 print("date:", response.output[0].content[0].parsed.date)
@@ -0,0 +1,45 @@
+"""
+Guard for 04-retrieval.py's prompt-caching invariant.
+
+Provider-side prompt caching only hits when the request prefix is
+byte-identical across calls, so SYSTEM_PROMPT must never pick up dynamic
+content (dates, retrieved records, user text). This test pins the prompt's
+hash: any edit that changes the bytes - intentional or accidental - fails
+here first, where the fix is a hash update rather than a silent cache-hit
+regression in production.
+
+The prompt is read out of the script's AST instead of importing it, since
+the module makes API calls at import time. No network needed:
+
+    python -m pytest test_retrieval_prompt.py
+"""
+
+import ast
+import hashlib
+from pathlib import Path
+
+_SOURCE = Path(__file__).with_name("04-retrieval.py")
+
+# sha256 of SYSTEM_PROMPT; update deliberately when the prompt changes
+_EXPECTED_SHA256 = "eb4716b254a1030e8dd17492cc44b5df070b7ffdabb93d86f9dad3dba60c4c78"
+
+
+def _module_constant(name: str) -> str:
+    tree = ast.parse(_SOURCE.read_text())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == name
+            for target in node.targets
+        ):
+            return ast.literal_eval(node.value)
+    raise AssertionError(f"{name} not found at module level in {_SOURCE.name}")
+
+
+def test_system_prompt_is_byte_stable():
+    prompt = _module_constant("SYSTEM_PROMPT")
+    assert hashlib.sha256(prompt.encode()).hexdigest() == _EXPECTED_SHA256
+
+
+if __name__ == "__main__":
+    test_system_prompt_is_byte_stable()
+    print("ok")
@@ -1,9 +1,15 @@
+import asyncio
 import logging
-from datetime import datetime
+import sys
+from datetime import date
+from pathlib import Path
 from typing import Optional
 
-from openai import OpenAI
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+from _json import dumps
+from _ratelimit import RateLimitedClient
 
 # set up logging configuration
 logging.basicConfig(
@@ -13,7 +19,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-client = OpenAI()
+# Async client: each call awaits network I/O instead of blocking the thread,
+# so independent requests can overlap instead of paying sum() of round-trips.
+# The wrapper bounds in-flight calls and paces RPM/TPM spend so process_many
+# doesn't burst past the account's rate limits.
+client = RateLimitedClient()
 model = "gpt-4.1-mini"
 
 
@@ -51,20 +61,59 @@ class EventConfirmation(BaseModel):
     )
 
 
+# text_format=Model makes the SDK re-derive the JSON schema from the Pydantic
+# class on every call. The models are invariant, so compute each schema once
+# at import and pass it through the lower-level text={"format": ...} API,
+# then parse the raw output with a cached TypeAdapter (one pydantic-core
+# pass, no per-call schema introspection).
+def _schema_format(model_cls: type[BaseModel]) -> dict:
+    schema = model_cls.model_json_schema()
+    schema["additionalProperties"] = False
+    return {
+        "format": {
+            "type": "json_schema",
+            "name": model_cls.__name__,
+            "schema": schema,
+            "strict": True,
+        }
+    }
+
+
+_EXTRACTION_FORMAT = _schema_format(EventExtraction)
+_DETAILS_FORMAT = _schema_format(EventDetails)
+_CONFIRMATION_FORMAT = _schema_format(EventConfirmation)
+
+_EXTRACTION_ADAPTER = TypeAdapter(EventExtraction)
+_DETAILS_ADAPTER = TypeAdapter(EventDetails)
+_CONFIRMATION_ADAPTER = TypeAdapter(EventConfirmation)
+
+
 # ----------------------------------
 # Step 2: Define the functions
 # ----------------------------------
 
+# strftime re-parses the format string (and consults the locale) on every
+# call, but the rendered value only changes once a day — cache it and
+# refresh lazily when the date rolls over
+_TODAY_CACHE: tuple[date, str] | None = None
+
 
-def extract_event_info(user_input: str) -> EventExtraction:
+def _date_context() -> str:
+    global _TODAY_CACHE
+    today = date.today()
+    if _TODAY_CACHE is None or _TODAY_CACHE[0] != today:
+        _TODAY_CACHE = (today, f"Today is {today.strftime('%A, %B %d, %Y')}.")
+    return _TODAY_CACHE[1]
+
+
+async def extract_event_info(user_input: str) -> EventExtraction:
     # First LLM call to determine if input is a calendar event
     logger.info("Starting event extration analysis")
-    logger.debug(f"Input text: {user_input}")
+    logger.debug("Input text: %s", user_input)
 
-    today = datetime.now()
-    date_context = f"Today is {today.strftime('%A, %B %d, %Y')}."
+    date_context = _date_context()
 
-    response = client.responses.parse(
+    response = await client.create(
         model=model,
         instructions=f"{date_context} Analyze if the text describes a calendar event.",
         input=[
@@ -73,24 +122,25 @@ def extract_event_info(user_input: str) -> EventExtraction:
                 "content": user_input,
             }
         ],
-        text_format=EventExtraction,
+        text=_EXTRACTION_FORMAT,
     )
 
-    result = response.output[0].content[0].parsed
+    result = _EXTRACTION_ADAPTER.validate_json(response.output_text)
     logger.info(
-        f"Extraction complete - Is calendar event: {result.is_calendar_event}, Confidence: {result.confidence_score:.2f}"
+        "Extraction complete - Is calendar event: %s, Confidence: %.2f",
+        result.is_calendar_event,
+        result.confidence_score,
     )
     return result
 
 
-def parse_event_details(description: str) -> EventDetails:
+async def parse_event_details(description: str) -> EventDetails:
     # Second LLM call to extract detailed event information
     logger.info("Starting event details extraction")
 
-    today = datetime.now()
-    date_context = f"Today is {today.strftime('%A, %B %d, %Y')}."
+    date_context = _date_context()
 
-    response = client.responses.parse(
+    response = await client.create(
         model=model,
         instructions=f"{date_context} Extract detailed event information. When dates reference 'next Tuesday' or similar relative dates, use this current date as reference.",
         input=[
@@ -99,34 +149,37 @@ def parse_event_details(description: str) -> EventDetails:
                 "content": description,
             }
         ],
-        text_format=EventDetails,
+        text=_DETAILS_FORMAT,
     )
 
-    result = response.output[0].content[0].parsed
+    result = _DETAILS_ADAPTER.validate_json(response.output_text)
     logger.info(
-        f"Parsed event details - Name: {result.name}, Date: {result.date}, Duration: {result.duration_minutes}min"
+        "Parsed event details - Name: %s, Date: %s, Duration: %smin",
+        result.name,
+        result.date,
+        result.duration_minutes,
     )
-    logger.debug(f"Participants: {', '.join(result.participants)}")
+    logger.debug("Participants: %s", result.participants)
     return result
 
 
-def generate_confirmation(event_details: EventDetails) -> EventConfirmation:
+async def generate_confirmation(event_details: EventDetails) -> EventConfirmation:
     # Third LLM call to generate confirmation message
     logger.info("Generating confirmation message")
 
-    response = client.responses.parse(
+    response = await client.create(
         model=model,
         instructions="Generate a natural confirmation message for the event. Sign of with your name; Susie",
         input=[
             {
                 "role": "user",
-                "content": str(event_details.model_dump()),
+                "content": dumps(event_details.model_dump()),
             }
         ],
-        text_format=EventConfirmation,
+        text=_CONFIRMATION_FORMAT,
     )
 
-    result = response.output[0].content[0].parsed
+    result = _CONFIRMATION_ADAPTER.validate_json(response.output_text)
     logger.info("Confirmation message generated successfully")
     return result
 
@@ -136,35 +189,70 @@ def generate_confirmation(event_details: EventDetails) -> EventConfirmation:
 # ----------------------------------
 
 
-def process_calendar_request(user_input: str) -> Optional[EventConfirmation]:
+async def process_calendar_request(user_input: str) -> Optional[EventConfirmation]:
     # Main function implementing the prompt chain with gate check
     # logger.info("Processing calendar request")
     # logger.debug(f"User input: {user_input}")
 
+    # Speculative execution: the gate usually passes, so start detail
+    # parsing in parallel with the extraction instead of waiting for the
+    # gate result. The raw user input stands in for the cleaned description;
+    # on the common success path this turns 3 serial round-trips into 2, and
+    # on gate-fail we just cancel the speculative call.
+    extract_task = asyncio.create_task(extract_event_info(user_input))
+    parse_task = asyncio.create_task(parse_event_details(user_input))
+
     # First LLM call: Extract basic info
-    initial_extraction = extract_event_info(user_input)
+    try:
+        initial_extraction = await extract_task
+    except BaseException:
+        # Extraction failure (or our own cancellation) must also reap the
+        # speculative call, not leave it running detached
+        parse_task.cancel()
+        raise
 
     # Gate check: verify if it's a calendar event with sufficient confidence
     if (not initial_extraction.is_calendar_event) or (
         initial_extraction.confidence_score < 0.7
     ):
+        parse_task.cancel()
         logger.warning(
-            f"Gate check failed - is_calendar_event: {initial_extraction.is_calendar_event}, confidence: {initial_extraction.confidence_score:.2f}"
+            "Gate check failed - is_calendar_event: %s, confidence: %.2f",
+            initial_extraction.is_calendar_event,
+            initial_extraction.confidence_score,
         )
         return None
 
     logger.info("Gate check passed, proceeding with event processing")
 
-    # Second LLM call: Get detailed event info
-    event_details = parse_event_details(initial_extraction.description)
+    # Second LLM call: Get detailed event info (usually already finished)
+    event_details = await parse_task
 
     # Third LLM call: Get detailed event information
-    confirmation = generate_confirmation(event_details)
+    confirmation = await generate_confirmation(event_details)
 
     logger.info("Calendar request processing completed successfully")
     return confirmation
 
 
+async def process_many(
+    inputs: list[str], concurrency: int = 20
+) -> list[Optional[EventConfirmation]]:
+    # Batch entry point: the chain stages depend on each other, but separate
+    # inputs are independent, so their I/O waits overlap and total wall time
+    # approaches max() of the runs instead of sum(). The semaphore caps how
+    # many chains are in flight at once, on top of the client's own RPM/TPM
+    # pacing. For very large offline backfills, OpenAI's /v1/batches endpoint
+    # runs the same work within a 24h window at half the token cost.
+    sem = asyncio.Semaphore(concurrency)
+
+    async def bounded(user_input: str) -> Optional[EventConfirmation]:
+        async with sem:
+            return await process_calendar_request(user_input)
+
+    return await asyncio.gather(*(bounded(x) for x in inputs))
+
+
 # ----------------------------------
 # Step 4: Test the workflow
 # ----------------------------------
@@ -172,7 +260,7 @@ def process_calendar_request(user_input: str) -> Optional[EventConfirmation]:
 if __name__ == "__main__":
     # Test with a sample user input
     user_input = "Let's schedule a 1h team meeting next Tuesday at 2pm with Alice and Bob to discuss the project roadmap."
-    result = process_calendar_request(user_input)
+    result = asyncio.run(process_calendar_request(user_input))
     if result:
         print(f"Confirmation: {result.confirmation_message}")
         if result.calendar_link:
@@ -22,11 +22,10 @@ and manage computational resources.
 
 import asyncio
 import logging
+import time
 from typing import List, Optional
-from datetime import datetime
 
-from openai import OpenAI
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 
 # Set up logging configuration
 logging.basicConfig(
@@ -36,7 +35,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-client = OpenAI()
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+from _client import aclient
+from _json import dumps, loads
+from _ratelimit import parse_as
+
 model = "gpt-4.1-mini"
 
 
@@ -46,7 +52,11 @@ model = "gpt-4.1-mini"
 
 
 class DocumentAnalysis(BaseModel):
-    # Analysis results for a single document
+    # Analysis results for a single document. Validation happens once, at
+    # parse time; extra keys from the model are dropped rather than rejected,
+    # and frozen instances skip per-assignment validation machinery entirely
+    model_config = ConfigDict(extra="ignore", validate_assignment=False, frozen=True)
+
     document_id: str = Field(description="Unique identifier for the document")
     sentiment_score: float = Field(description="Sentiment score from -1 to 1")
     key_topics: List[str] = Field(description="Main topics identified")
@@ -54,8 +64,19 @@ class DocumentAnalysis(BaseModel):
     language: str = Field(description="Detected language of the document")
 
 
+class DocumentAnalyses(BaseModel):
+    # Wrapper so one fused LLM call can return every document's analysis
+    model_config = ConfigDict(extra="ignore", validate_assignment=False, frozen=True)
+
+    results: List[DocumentAnalysis] = Field(
+        description="Analysis for each document, in input order"
+    )
+
+
 class BatchAnalysisResult(BaseModel):
     # Combined results from parallel document analysis
+    model_config = ConfigDict(extra="ignore", validate_assignment=False, frozen=True)
+
     total_documents: int = Field(description="Total number of documents processed")
     average_sentiment: float = Field(
         description="Average sentiment across all documents"
@@ -69,58 +90,218 @@ class BatchAnalysisResult(BaseModel):
     results: List[DocumentAnalysis] = Field(description="Individual document results")
 
 
-# ----------------------------------
-# Step 2: Define the parallel processing functions
-# ----------------------------------
+# Request body template for the Batch API: each document becomes one
+# /v1/responses call constrained to the DocumentAnalysis schema
+def _doc_schema_format() -> dict:
+    schema = DocumentAnalysis.model_json_schema()
+    schema["additionalProperties"] = False
+    return {
+        "format": {
+            "type": "json_schema",
+            "name": "DocumentAnalysis",
+            "schema": schema,
+            "strict": True,
+        }
+    }
+
+
+_DOC_FORMAT = _doc_schema_format()
+_DOC_ADAPTER = TypeAdapter(DocumentAnalysis)
+
+ANALYZER_SYSTEM = (
+    "Analyze the document: report a sentiment score from -1 to 1, the main "
+    "topics, a brief summary, and the detected language. Use the document id "
+    "you were given."
+)
 
+BATCH_ANALYZER_SYSTEM = (
+    "You will receive a JSON array of documents, each with an id and text. "
+    "Analyze every document: report a sentiment score from -1 to 1, the main "
+    "topics, a brief summary, and the detected language. Return one analysis "
+    "per document, keyed by the given id, in the same order as the input."
+)
 
-async def analyze_document(document_id: str, text: str) -> DocumentAnalysis:
-    """Analyze a single document asynchronously"""
-    logger.info(f"Analyzing document {document_id}")
+# How many documents to fuse into one request; beyond this the prompt gets
+# long enough that output quality and latency start to suffer
+FUSED_CHUNK_SIZE = 20
 
-    # Simulate processing time
-    await asyncio.sleep(random.uniform(0.5, 1.5))
 
-    # Generate random results
-    sentiment_score = random.uniform(-1, 1)
-    key_topics = random.sample(
-        ["AI", "Machine Learning", "Data Science", "Blockchain", "Quantum Computing"],
-        random.randint(1, 3),
-    )
+# ----------------------------------
+# Step 2: Define the parallel processing functions
+# ----------------------------------
 
-    summary = f"This document discusses {', '.join(key_topics)} and has a sentiment score of {sentiment_score:.2f}"
 
-    return DocumentAnalysis(
-        document_id=document_id,
-        sentiment_score=sentiment_score,
-        key_topics=key_topics,
-        summary=summary,
-        language="en",
+async def analyze_documents(chunk: List[tuple[str, str]]) -> List[DocumentAnalysis]:
+    """Analyze a group of documents in one fused LLM call.
+
+    One request carrying the whole group replaces one request per document:
+    same semantic work, but N-1 round-trips and N-1 copies of the prompt
+    prefix disappear.
+    """
+    logger.info("Analyzing %d documents in one call", len(chunk))
+
+    payload = dumps([{"id": doc_id, "text": text} for doc_id, text in chunk])
+    analyses = await parse_as(
+        DocumentAnalyses,
+        model=model,
+        input=[
+            {"role": "system", "content": BATCH_ANALYZER_SYSTEM},
+            {"role": "user", "content": payload},
+        ],
+        extra_body={"prompt_cache_key": "batch-analyzer-v1"},
     )
 
+    # Don't trust the model to have returned exactly one result per input:
+    # index by document id and re-run anything dropped or mislabeled with a
+    # per-document call, keyed by the id we asked for. Extra or unknown-id
+    # results fall out when reassembling in input order.
+    by_id = {analysis.document_id: analysis for analysis in analyses.results}
+    missing = [(doc_id, text) for doc_id, text in chunk if doc_id not in by_id]
+    if missing:
+        logger.warning(
+            "Fused call returned %d of %d documents; re-running %d individually",
+            len(chunk) - len(missing),
+            len(chunk),
+            len(missing),
+        )
+        recovered = await asyncio.gather(
+            *(analyze_document(doc_id, text) for doc_id, text in missing)
+        )
+        for (doc_id, _), analysis in zip(missing, recovered):
+            by_id[doc_id] = analysis
+
+    return [by_id[doc_id] for doc_id, _ in chunk]
 
-async def analyze_batch(documents: List[str]) -> BatchAnalysisResult:
-    """Analyze a batch of documents in parallel"""
-    start_time = datetime.now()
-    logger.info(f"Starting batch analysis of {len(documents)} documents")
 
-    # Create a list of tasks to run in parallel
-    tasks = [analyze_document(str(i), doc) for i, doc in enumerate(documents)]
+async def analyze_document(document_id: str, text: str) -> DocumentAnalysis:
+    """Analyze one document - the fallback path for documents the fused
+    call dropped or mislabeled"""
+    logger.debug("Analyzing document %s individually", document_id)
+
+    return await parse_as(
+        DocumentAnalysis,
+        model=model,
+        input=[
+            {"role": "system", "content": ANALYZER_SYSTEM},
+            {"role": "user", "content": f"Document id {document_id}:\n{text}"},
+        ],
+        extra_body={"prompt_cache_key": "doc-analyzer-v1"},
+    )
 
-    # Run all tasks concurrently
-    results = await asyncio.gather(*tasks)
 
-    # Combine results into a single response
-    total_documents = len(results)
-    average_sentiment = (
-        sum(result.sentiment_score for result in results) / total_documents
+def _batch_output_text(body: dict) -> str:
+    # A /v1/responses body inside a batch output line is the raw Response
+    # JSON; pull the text out of the first message item
+    for item in body["output"]:
+        if item.get("type") == "message":
+            return item["content"][0]["text"]
+    raise ValueError("No message output in batch response body")
+
+
+async def _analyze_offline(documents: List[str]) -> List[DocumentAnalysis]:
+    """Analyze documents through the Batch API (50% cheaper, minutes-to-hours
+    latency) - for workloads like nightly document analysis where nobody is
+    waiting on the response"""
+    lines = [
+        dumps(
+            {
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/responses",
+                "body": {
+                    "model": model,
+                    "input": [
+                        {"role": "system", "content": ANALYZER_SYSTEM},
+                        {"role": "user", "content": f"Document id {i}:\n{doc}"},
+                    ],
+                    "text": _DOC_FORMAT,
+                },
+            }
+        )
+        for i, doc in enumerate(documents)
+    ]
+
+    batch_file = await aclient.files.create(
+        file=("batch_input.jsonl", "\n".join(lines).encode()),
+        purpose="batch",
     )
-    common_topics = set.intersection(*[set(result.key_topics) for result in results])
+    batch = await aclient.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/responses",
+        completion_window="24h",
+    )
+    logger.info("Submitted batch %s with %d documents", batch.id, len(documents))
+
+    # Poll with exponential backoff; batches take minutes at best, so there
+    # is no point hammering the status endpoint
+    delay = 5.0
+    while True:
+        batch = await aclient.batches.retrieve(batch.id)
+        if batch.status == "completed":
+            break
+        if batch.status in ("failed", "expired", "cancelled"):
+            raise RuntimeError(f"Batch {batch.id} ended with status {batch.status}")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 300)
+
+    output = await aclient.files.content(batch.output_file_id)
+    by_id: dict[str, DocumentAnalysis] = {}
+    for line in output.text.splitlines():
+        record = loads(line)
+        text = _batch_output_text(record["response"]["body"])
+        by_id[record["custom_id"]] = _DOC_ADAPTER.validate_json(text)
+
+    # Batch output lines arrive in completion order, not submission order
+    return [by_id[str(i)] for i in range(len(documents))]
+
+
+async def analyze_batch(
+    documents: List[str], mode: str = "realtime"
+) -> BatchAnalysisResult:
+    """Analyze a batch of documents.
+
+    mode="realtime" fans out concurrent online calls for minimum wall-clock
+    time; mode="batch" routes through the Batch API for half the token cost
+    when the caller can tolerate the 24h completion window.
+    """
+    # perf_counter_ns: monotonic, integer, no wall-clock machinery on the
+    # measurement path
+    start_ns = time.perf_counter_ns()
+    logger.info("Starting %s analysis of %d documents", mode, len(documents))
+
+    if mode == "batch":
+        results = await _analyze_offline(documents)
+    else:
+        # Fuse documents into groups of FUSED_CHUNK_SIZE, then run the
+        # groups concurrently: fusion removes per-document round-trips,
+        # parallelism keeps large batches fast
+        pairs = [(str(i), doc) for i, doc in enumerate(documents)]
+        chunks = [
+            pairs[i : i + FUSED_CHUNK_SIZE]
+            for i in range(0, len(pairs), FUSED_CHUNK_SIZE)
+        ]
+        chunk_results = await asyncio.gather(*(analyze_documents(c) for c in chunks))
+        results = [analysis for chunk in chunk_results for analysis in chunk]
+
+    # Combine results into a single response. This aggregation runs on the
+    # CPU after gather() and delays the return, so fuse the sentiment sum
+    # and the topic intersection into one pass instead of walking the
+    # results twice and boxing N intermediate sets.
+    total_documents = len(results)
+    total_sentiment = results[0].sentiment_score
+    common_topics = set(results[0].key_topics)
+    for result in results[1:]:
+        total_sentiment += result.sentiment_score
+        common_topics &= set(result.key_topics)
+    average_sentiment = total_sentiment / total_documents
 
     # Calculate total processing time
-    analysis_duration_ms = int((datetime.now() - start_time).total_seconds() * 1000)
+    analysis_duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
 
-    return BatchAnalysisResult(
+    # Every DocumentAnalysis in results was already validated at parse
+    # time, so model_construct skips re-validating N children just to box
+    # them into the aggregate
+    return BatchAnalysisResult.model_construct(
         total_documents=total_documents,
         average_sentiment=average_sentiment,
         common_topics=list(common_topics),
@@ -148,21 +329,25 @@ async def main():
     result = await analyze_batch(documents)
 
     # Print the results
-    logger.info(f"Batch analysis completed in {result.analysis_duration_ms}ms")
-    logger.info(f"Total documents processed: {result.total_documents}")
-    logger.info(f"Average sentiment: {result.average_sentiment:.2f}")
-    logger.info(f"Common topics: {', '.join(result.common_topics)}")
-
-    # Print individual document results
-    for doc in result.results:
-        logger.info(f"Document {doc.document_id}:")
-        logger.info(f"  Sentiment: {doc.sentiment_score:.2f}")
-        logger.info(f"  Topics: {', '.join(doc.key_topics)}")
-        logger.info(f"  Summary: {doc.summary}")
+    logger.info("Batch analysis completed in %dms", result.analysis_duration_ms)
+    logger.info("Total documents processed: %d", result.total_documents)
+    logger.info("Average sentiment: %.2f", result.average_sentiment)
+    logger.info("Common topics: %s", ", ".join(result.common_topics))
+
+    # Per-document detail is debug-only: at batch scale these lines dominate
+    # log volume without adding to the summary above
+    if logger.isEnabledFor(logging.DEBUG):
+        for doc in result.results:
+            logger.debug(
+                "Document %s: sentiment %.2f, topics %s, summary %s",
+                doc.document_id,
+                doc.sentiment_score,
+                ", ".join(doc.key_topics),
+                doc.summary,
+            )
 
 
 if __name__ == "__main__":
-    import random
     import nest_asyncio
 
     nest_asyncio.apply()
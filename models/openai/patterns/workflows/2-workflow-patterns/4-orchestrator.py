@@ -20,12 +20,14 @@ The orchestrator LLM acts as a conductor, determining the sequence of
 operations and coordinating the flow of information between components.
 """
 
+import asyncio
+import hashlib
 import logging
-from typing import List, Optional
-from datetime import datetime
+import time
+from typing import Callable, List, Optional
+from datetime import datetime, timezone
 
-from openai import OpenAI
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 # Set up logging configuration
 logging.basicConfig(
@@ -35,28 +37,142 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-client = OpenAI()
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+from _json import dumps
+from _ratelimit import parse_as, stream
+
 model = "gpt-4.1-mini"
 
+# Upper bound on tasks in flight at once, sized to the provider rate limit
+MAX_CONCURRENT_TASKS = 8
+
+# Fuse sibling tasks into one call only while the combined prompt stays
+# modest (~2000 tokens); past this, one giant request loses more to output
+# quality and latency than the saved round-trips buy
+FUSE_MAX_PROMPT_CHARS = 8_000
+
+# Stable system prompts as module constants: provider-side prompt caching
+# needs a byte-identical prefix across calls, so the constant system message
+# goes first and the dynamic content rides in the user message. Every
+# execute_task call shares EXECUTOR_SYSTEM, so the N per-task calls all hit
+# one cached prefix.
+PLANNER_SYSTEM = """You are a workflow planner. Break the user's objective
+down into a series of discrete tasks.
+
+For each task provide:
+- task_id: a short unique identifier
+- description: a self-contained instruction for what needs to be done
+- dependencies: the task_ids that must complete before this one can start
+- status: "pending" for every task in a fresh plan
+
+Keep tasks independent wherever possible so they can run in parallel; only
+add a dependency when a task genuinely needs another task's output."""
+
+EXECUTOR_SYSTEM = """You are a task executor inside a larger workflow.
+Execute the task described in the user's message. The message may include
+results from upstream tasks, each tagged with its task id - build on them
+rather than redoing their work.
+
+Return:
+- output: the task's main result, with no preamble or commentary
+- artifacts: any named values downstream tasks may need (e.g. extracted
+  titles, links, counts), as a list of name/value pairs
+- confidence: how confident you are in the result, between 0 and 1"""
+
+FUSED_EXECUTOR_SYSTEM = """You are a task executor inside a larger workflow.
+You will receive a JSON array of independent tasks, each with an id, a
+description, and possibly results from upstream tasks. Execute every task
+and return one result per task, tagged with the task's id, in the same
+order as the input.
+
+For each task return:
+- output: the task's main result, with no preamble or commentary
+- artifacts: any named values downstream tasks may need, as a list of
+  name/value pairs
+- confidence: how confident you are in the result, between 0 and 1"""
+
 
 # ----------------------------------
 # Step 1: Define the data models for orchestration
 # ----------------------------------
 
 
+class Artifact(BaseModel):
+    """One named value a task hands to downstream tasks.
+
+    A name/value pair rather than a dict entry: strict-mode structured
+    outputs require additionalProperties: false on every object, which a
+    free-form dict field cannot satisfy.
+    """
+
+    model_config = ConfigDict(extra="ignore", validate_assignment=False, frozen=True)
+
+    name: str = Field(description="Name of the artifact")
+    value: str = Field(description="The artifact's value, as a short string")
+
+
+class TaskResult(BaseModel):
+    """Structured output from a single task.
+
+    Typed fields mean downstream tasks consume upstream results directly -
+    no follow-up LLM call to re-extract values from free-form prose.
+    """
+
+    model_config = ConfigDict(extra="ignore", validate_assignment=False, frozen=True)
+
+    output: str = Field(description="The task's main result")
+    artifacts: List[Artifact] = Field(
+        description="Named values downstream tasks may need"
+    )
+    confidence: float = Field(description="Confidence in the result, 0 to 1")
+
+
+class FusedTaskResult(BaseModel):
+    """One task's result inside a fused sibling call, tagged for matching"""
+
+    model_config = ConfigDict(extra="ignore", validate_assignment=False, frozen=True)
+
+    task_id: str = Field(description="Id of the task this result belongs to")
+    result: TaskResult = Field(description="The task's result")
+
+
+class FusedTaskResults(BaseModel):
+    """Wrapper so one fused call returns every sibling task's result"""
+
+    model_config = ConfigDict(extra="ignore", validate_assignment=False, frozen=True)
+
+    results: List[FusedTaskResult] = Field(
+        description="One result per task, in input order"
+    )
+
+
 class Task(BaseModel):
-    """Individual task in the workflow"""
+    """Individual task in the workflow.
+
+    Not frozen: the executor writes status and result in place as the DAG
+    progresses. validate_assignment stays off so those writes are plain
+    attribute stores, not pydantic-core round-trips.
+    """
+
+    model_config = ConfigDict(extra="ignore", validate_assignment=False)
 
     task_id: str = Field(description="Unique identifier for the task")
     description: str = Field(description="Description of what needs to be done")
     dependencies: List[str] = Field(description="IDs of tasks that must complete first")
     status: str = Field(description="Current status of the task")
-    result: Optional[str] = Field(description="Output from the task if completed")
+    result: Optional[TaskResult] = Field(
+        description="Output from the task if completed"
+    )
 
 
 class WorkflowPlan(BaseModel):
     """Overall plan for executing the workflow"""
 
+    model_config = ConfigDict(extra="ignore", validate_assignment=False)
+
     workflow_id: str = Field(description="Unique identifier for the workflow")
     tasks: List[Task] = Field(description="List of tasks to be executed")
     current_stage: str = Field(description="Current stage of workflow execution")
@@ -69,6 +185,8 @@ class WorkflowPlan(BaseModel):
 class WorkflowResult(BaseModel):
     """Final results from the workflow"""
 
+    model_config = ConfigDict(extra="ignore", validate_assignment=False, frozen=True)
+
     workflow_id: str = Field(description="ID of the completed workflow")
     success: bool = Field(description="Whether the workflow completed successfully")
     results: dict = Field(description="Combined results from all tasks")
@@ -81,67 +199,209 @@ class WorkflowResult(BaseModel):
 # ----------------------------------
 
 
-def create_workflow_plan(objective: str) -> WorkflowPlan:
-    """Have the orchestrator LLM break down the objective into tasks"""
-    logger.info(f"Creating workflow plan for: {objective}")
+# Planner calls in flight, keyed by objective hash: concurrent requests for
+# the same objective (retry storms, duplicate submissions) share one call
+_plan_inflight: dict[str, asyncio.Future] = {}
 
-    response = client.responses.parse(
-        model=model,
-        instructions="""
-        Break down this objective into a series of discrete tasks.
-        Identify dependencies between tasks and create a workflow plan.
-        """,
-        input=[{"role": "user", "content": objective}],
-        text_format=WorkflowPlan,
-    )
 
-    plan = response.output[0].content[0].parsed
-    logger.info(f"Created workflow plan with {len(plan.tasks)} tasks")
-    return plan
+async def create_workflow_plan(objective: str) -> WorkflowPlan:
+    """Have the orchestrator LLM break down the objective into tasks.
 
+    Concurrent calls with the same objective coalesce onto one planner
+    request; waiters get a deep copy, since the executor mutates task
+    status and results in place.
+    """
+    key = hashlib.sha256(objective.strip().encode()).hexdigest()
+    fut = _plan_inflight.get(key)
+    if fut is not None:
+        logger.debug("Coalescing duplicate in-flight planner call")
+        return (await fut).model_copy(deep=True)
+
+    fut = asyncio.get_running_loop().create_future()
+    _plan_inflight[key] = fut
+    try:
+        logger.info("Creating workflow plan for: %s", objective)
+        plan = await parse_as(
+            WorkflowPlan,
+            model=model,
+            input=[
+                {"role": "system", "content": PLANNER_SYSTEM},
+                {"role": "user", "content": objective},
+            ],
+            extra_body={"prompt_cache_key": "workflow-planner-v1"},
+        )
+    except Exception as e:
+        # Waiters see the same failure the runner did
+        fut.set_exception(e)
+        raise
+    else:
+        fut.set_result(plan)
+        logger.info("Created workflow plan with %d tasks", len(plan.tasks))
+        return plan
+    finally:
+        # Cancellation skips the except above; cancel the future so
+        # coalesced waiters don't hang on an entry that's about to disappear
+        if not fut.done():
+            fut.cancel()
+        del _plan_inflight[key]
+
+
+async def execute_task(
+    task: Task,
+    upstream: dict[str, TaskResult],
+    on_delta: Optional[Callable[[str], None]] = None,
+) -> TaskResult:
+    """Execute a single task in the workflow, streaming its output.
+
+    Upstream dependency results are formatted into the prompt so the task
+    builds on completed work; the output comes back as a typed TaskResult.
+    Pass on_delta to observe partial output as it arrives.
+    """
+    logger.debug("Executing task: %s", task.task_id)
 
-def execute_task(task: Task) -> str:
-    """Execute a single task in the workflow"""
-    logger.info(f"Executing task: {task.task_id}")
+    content = task.description
+    if upstream:
+        upstream_block = "\n".join(
+            f"[{task_id}] {result.output}" for task_id, result in upstream.items()
+        )
+        content = f"{task.description}\n\nUpstream task results:\n{upstream_block}"
 
-    # Simulate task execution with appropriate LLM call
-    response = client.chat.completions.create(
+    async with stream(
         model=model,
-        messages=[
-            {"role": "system", "content": "Execute the following task:"},
-            {"role": "user", "content": task.description},
+        input=[
+            {"role": "system", "content": EXECUTOR_SYSTEM},
+            {"role": "user", "content": content},
         ],
+        text_format=TaskResult,
+        extra_body={"prompt_cache_key": "workflow-executor-v1"},
+    ) as task_stream:
+        async for event in task_stream:
+            if on_delta is not None and event.type == "response.output_text.delta":
+                on_delta(event.delta)
+        response = await task_stream.get_final_response()
+
+    result = response.output[0].content[0].parsed
+    logger.debug("Task %s completed", task.task_id)
+    return result
+
+
+def _topo_levels(tasks: List[Task]) -> List[List[Task]]:
+    """Group tasks into topological levels: every task in a level depends
+    only on tasks in earlier levels, so tasks within a level are mutually
+    independent"""
+    remaining = {task.task_id: task for task in tasks}
+    done: set[str] = set()
+    levels: List[List[Task]] = []
+    while remaining:
+        level = [
+            task
+            for task in remaining.values()
+            if all(dep in done for dep in task.dependencies)
+        ]
+        if not level:
+            raise ValueError("Dependency cycle in workflow plan")
+        for task in level:
+            del remaining[task.task_id]
+            done.add(task.task_id)
+        levels.append(level)
+    return levels
+
+
+def _task_payload(task: Task, results: dict[str, TaskResult]) -> dict:
+    payload: dict = {"id": task.task_id, "description": task.description}
+    if task.dependencies:
+        payload["upstream"] = {
+            dep: results[dep].output for dep in task.dependencies
+        }
+    return payload
+
+
+async def _execute_level_fused(
+    level: List[Task], results: dict[str, TaskResult]
+) -> dict[str, TaskResult]:
+    """Execute all tasks in a level with one fused LLM call.
+
+    Siblings in a level are independent, so one request carrying all of
+    them amortizes the prompt prefix and one network round-trip over K
+    tasks instead of paying K of each.
+    """
+    logger.debug("Fusing %d sibling tasks into one call", len(level))
+
+    payload = dumps([_task_payload(task, results) for task in level])
+    fused = await parse_as(
+        FusedTaskResults,
+        model=model,
+        input=[
+            {"role": "system", "content": FUSED_EXECUTOR_SYSTEM},
+            {"role": "user", "content": payload},
+        ],
+        extra_body={"prompt_cache_key": "workflow-executor-fused-v1"},
     )
+    return {entry.task_id: entry.result for entry in fused.results}
 
-    result = response.choices[0].message.content
-    logger.info(f"Task {task.task_id} completed")
-    return result
 
+async def _execute_level(
+    level: List[Task], results: dict[str, TaskResult], sem: asyncio.Semaphore
+) -> dict[str, TaskResult]:
+    """Execute one topological level, fused when the combined prompt is
+    small enough, otherwise as bounded per-task calls"""
+    level_results: dict[str, TaskResult] = {}
+
+    prompt_chars = sum(len(task.description) for task in level)
+    if len(level) > 1 and prompt_chars <= FUSE_MAX_PROMPT_CHARS:
+        level_results = await _execute_level_fused(level, results)
 
-def orchestrate_workflow(objective: str) -> WorkflowResult:
+    # Per-task path: levels of one, oversized levels, and any task the
+    # fused call failed to tag with its id
+    pending = [task for task in level if task.task_id not in level_results]
+
+    async def bounded(task: Task) -> tuple[str, TaskResult]:
+        upstream = {dep: results[dep] for dep in task.dependencies}
+        async with sem:
+            return task.task_id, await execute_task(task, upstream)
+
+    for task_id, result in await asyncio.gather(*(bounded(t) for t in pending)):
+        level_results[task_id] = result
+
+    for task in level:
+        task.result = level_results[task.task_id]
+        task.status = "completed"
+    return level_results
+
+
+async def orchestrate_workflow(objective: str) -> WorkflowResult:
     """Main orchestration function"""
-    start_time = datetime.now()
+    # Elapsed time comes from the monotonic counter; wall-clock timestamps
+    # stay on the plan for humans
+    start_ns = time.perf_counter_ns()
     logger.info("Starting workflow orchestration")
 
     try:
-        # Create the workflow plan
-        plan = create_workflow_plan(objective)
-        results = {}
-
-        # Execute tasks in dependency order
-        while not all(task.status == "completed" for task in plan.tasks):
-            for task in plan.tasks:
-                if task.status != "completed":
-                    # Check if dependencies are met
-                    deps_completed = all(dep in results for dep in task.dependencies)
-
-                    if deps_completed:
-                        task.result = execute_task(task)
-                        results[task.task_id] = task.result
-                        task.status = "completed"
+        # Create the workflow plan; stamp the actual start rather than
+        # whatever timestamp the planner model invented
+        plan = await create_workflow_plan(objective)
+        plan.start_time = datetime.now(timezone.utc)
+
+        # Topological-level execution: tasks in a level are mutually
+        # independent, so each level runs as either one fused call or a
+        # bounded parallel fan-out, and wall time tracks the number of
+        # levels rather than the number of tasks
+        levels = _topo_levels(plan.tasks)
+        sem = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
+
+        # One summary line for the whole DAG; per-task progress is debug
+        logger.info(
+            "Executing %d tasks in %d stages (max %d concurrent)",
+            len(plan.tasks),
+            len(levels),
+            MAX_CONCURRENT_TASKS,
+        )
+        results: dict[str, TaskResult] = {}
+        for level in levels:
+            results.update(await _execute_level(level, results, sem))
 
         # Calculate execution time
-        execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
+        execution_time = (time.perf_counter_ns() - start_ns) // 1_000_000
 
         return WorkflowResult(
             workflow_id=plan.workflow_id,
@@ -152,7 +412,7 @@ def orchestrate_workflow(objective: str) -> WorkflowResult:
         )
 
     except Exception as e:
-        logger.error(f"Workflow failed: {str(e)}")
+        logger.error("Workflow failed: %s", e)
         return WorkflowResult(
             workflow_id="failed",
             success=False,
@@ -174,14 +434,14 @@ def main():
     and create social media posts to share the insights.
     """
 
-    result = orchestrate_workflow(objective)
+    result = asyncio.run(orchestrate_workflow(objective))
 
     if result.success:
-        logger.info(f"Workflow completed in {result.execution_time_ms}ms")
+        logger.info("Workflow completed in %dms", result.execution_time_ms)
         for task_id, task_result in result.results.items():
-            logger.info(f"Task {task_id} result: {task_result[:100]}...")
+            logger.info("Task %s result: %.100s...", task_id, task_result.output)
     else:
-        logger.error(f"Workflow failed: {result.error_message}")
+        logger.error("Workflow failed: %s", result.error_message)
 
 
 if __name__ == "__main__":